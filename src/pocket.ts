@@ -0,0 +1,578 @@
+import { AsyncLocalStorage } from "async_hooks";
+
+// Default action used to route to a successor when a node's post does not
+// pick a specific branch
+export const DEFAULT_ACTION = "default";
+
+// Hoisted so the raise site reuses one string instead of rebuilding it
+const FLOW_DIRECT_EXEC_ERROR = "Flow node does not support direct execution";
+
+// Task-local handle on the shared state of the orchestration currently
+// executing, so deeply nested helpers can read it without threading the
+// object through every call. Each concurrent batch branch sees its own
+// async context, so parallel sub-flows don't interfere.
+const sharedStateStorage = new AsyncLocalStorage<any>();
+
+// Whether the current async context is a concurrent batch branch. Carried
+// task-locally so nested flows inherit it: a sub-Flow inside a branch calls
+// orchestrate without the isolate flag, but its stateless nodes are still
+// shared across branches and must be cloned per branch all the way down.
+const branchIsolationStorage = new AsyncLocalStorage<boolean>();
+
+// Shared by every node whose params were never set: most nodes in a graph
+// never receive params directly (the orchestrator hands them the flow's), so
+// allocating a fresh empty object per instance is wasted memory in graphs
+// with many nodes. Frozen so an accidental in-place mutation fails loudly
+// rather than leaking state across unrelated nodes.
+const EMPTY_PARAMS: any = Object.freeze({});
+
+// Retry backoffs share one pending timer per distinct interval: when many
+// batch items fail in the same window (a rate-limited downstream is the
+// typical cause), they all wake on a single timer firing instead of
+// registering one TimerHandle each. A waiter joining an in-flight tick may
+// wake up to intervalMs early, which is harmless for retry spacing.
+const pendingSleeps = new Map<number, Promise<void>>();
+function coalescedSleep(intervalMs: number): Promise<void> {
+    let pending = pendingSleeps.get(intervalMs);
+    if (pending === undefined) {
+        pending = new Promise<void>(resolve => setTimeout(() => {
+            pendingSleeps.delete(intervalMs);
+            resolve();
+        }, intervalMs));
+        pendingSleeps.set(intervalMs, pending);
+    }
+    return pending;
+}
+
+// Control-flow hints (e.g. an action that matches no successor) can fire on
+// every hop of a misconfigured graph; emit each distinct hint only once so
+// the hot path pays a Set lookup instead of console I/O per occurrence.
+const warnedKeys = new Set<string>();
+function warnOnce(key: string, message: string): void {
+    if (warnedKeys.has(key)) {
+        return;
+    }
+    warnedKeys.add(key);
+    console.warn(message);
+}
+
+// Bumped every time a successor edge is added anywhere. Flows compare this
+// against the version they compiled their traversal table at, so graph
+// mutations after Flow construction trigger a lazy recompile.
+let graphVersion = 0;
+
+export abstract class BaseNode {
+    public flow_params: any;
+    public successors: Map<string, BaseNode>;
+
+    /**
+     * Nodes that keep no per-run instance state (execCore is pure apart from
+     * the shared state and flow_params) can set this to true to be reused
+     * across traversal hops instead of cloned on every visit. Since setParams
+     * just overwrites flow_params, reuse is safe for sequential orchestration.
+     */
+    public isStateless: boolean = false;
+
+    constructor() {
+        this.flow_params = EMPTY_PARAMS;
+        this.successors = new Map();
+    }
+
+    /**
+     * The shared state of the orchestration this node is currently running
+     * in, without it having been passed down explicitly. Only defined while
+     * a Flow is orchestrating; the explicit arguments remain the primary API.
+     */
+    public get sharedState(): any {
+        return sharedStateStorage.getStore();
+    }
+
+    public setParams(params: any): void {
+        // The orchestrator passes the same params object on every hop, so a
+        // reused (stateless) node is usually being handed what it already has
+        if (this.flow_params === params) {
+            return;
+        }
+        this.flow_params = params;
+    }
+
+    public clone(): BaseNode {
+        const newNode = this._clone();
+        // flow_params is shared by reference rather than deep-copied: the
+        // orchestrator overwrites it via setParams before every run, so a
+        // deep copy per hop is pure overhead on graphs with many small nodes.
+        newNode.flow_params = this.flow_params;
+        newNode.successors = new Map(this.successors);
+        return newNode;
+    }
+
+    abstract _clone(): BaseNode;
+
+    public addSuccessor(newSuccessor: BaseNode, action: string = DEFAULT_ACTION): void {
+        if (this.successors.has(action)) {
+            throw new Error(`Action ${action} already exists`);
+        }
+
+        this.successors.set(action, newSuccessor);
+        graphVersion++;
+    }
+
+    public getSuccessor(name: string): BaseNode | undefined {
+        // Single Map lookup instead of a has/get pair
+        const successor = this.successors.get(name);
+        if (successor === undefined) {
+            return undefined;
+        }
+
+        // This is important for parallel execution to not have race conditions
+        return successor.clone();
+    }
+    
+    abstract prep(sharedState: any): Promise<any>;
+
+    /**
+     * We allow you to implement custom wrappers over any core execution logic
+     * 
+     * Exec handler logic - this could be higher level retry and 
+     * robustness logic that could be used across many node types
+     * @param prepResult 
+     * @returns 
+     */
+    public execWrapper(prepResult: any): Promise<any> {
+        return this.execCore(prepResult);
+    }
+
+    /**
+     * This is the primary execution step of a node and is typically 
+     * the core component of a node implementation
+     * @param prepResult 
+     */
+    abstract execCore(prepResult: any): Promise<any>;
+
+    abstract post(prepResult: any, execResult: any, sharedState: any): Promise<string>;
+
+    /**
+     *  Core run logic should not change from node to node implementation
+     * @param sharedState Contextual state that is shared across nodes
+     */
+    public async run(sharedState: any): Promise<string> {
+        const prepResult = await this.prep(sharedState);
+        const execResult = await this.execWrapper(prepResult);
+        const action = await this.post(prepResult, execResult, sharedState);
+
+        return action;
+    }
+}
+
+export abstract class RetryNode extends BaseNode {
+    protected maxRetries: number;
+    protected intervalMs: number;
+
+    constructor(maxRetries: number, intervalMs: number) {
+        super();
+        this.maxRetries = maxRetries;
+        this.intervalMs = intervalMs;
+        // A single attempt never retries, so skip the loop and error
+        // bookkeeping entirely and dispatch straight to execCore, letting
+        // failures propagate unwrapped. Only applies to the stock wrapper:
+        // a subclass overriding execWrapper keeps its own dispatch.
+        if (maxRetries === 1 && this.execWrapper === RetryNode.prototype.execWrapper) {
+            this.execWrapper = (prepResult: any) => this.execCore(prepResult);
+        }
+    }
+
+    public async execWrapper(prepResult: any): Promise<any> {
+        let lastError: unknown = undefined;
+        for (let i = 0; i < this.maxRetries; i++) {
+            try {
+                return await this.execCore(prepResult);
+            } catch (error) {
+                lastError = error;
+                // Don't sleep after the final attempt — nothing follows it
+                if (i < this.maxRetries - 1) {
+                    await coalescedSleep(this.intervalMs);
+                }
+            }
+        }
+
+        const reason = lastError instanceof Error ? `: ${lastError.message}` : "";
+        throw new Error("Max retries reached after " + this.maxRetries + " attempts" + reason);
+    }
+}
+
+export abstract class BatchNode extends BaseNode {
+    protected workers: number;
+
+    /**
+     * @param workers number of items processed at once; 1 keeps the serial
+     *        path with zero pooling overhead, >1 overlaps blocking-I/O items
+     *        so an N-item batch costs ~one item's latency instead of N.
+     */
+    constructor(workers: number = 1) {
+        super();
+        this.workers = workers;
+    }
+
+    /**
+     * Process a single item of the batch. prep should return the list of
+     * items to process.
+     * @param item one element of the prep result
+     */
+    abstract execItem(item: any): Promise<any>;
+
+    async execCore(items: any[]): Promise<any[]> {
+        if (!items || items.length === 0) {
+            return [];
+        }
+
+        // Resolve the execItem dispatch once instead of repeating the
+        // method lookup per item inside the loops below
+        const execItem = this.execItem.bind(this);
+        const count = items.length;
+
+        if (this.workers > 1 && count > 1) {
+            const results: any[] = new Array(count);
+            let nextIndex = 0;
+            const worker = async (): Promise<void> => {
+                while (nextIndex < count) {
+                    const i = nextIndex++;
+                    results[i] = await execItem(items[i]);
+                }
+            };
+            await Promise.all(Array.from({ length: Math.min(this.workers, count) }, worker));
+            return results;
+        }
+
+        const results: any[] = new Array(count);
+        for (let i = 0; i < count; i++) {
+            results[i] = await execItem(items[i]);
+        }
+        return results;
+    }
+}
+
+// Per-node record in a Flow's compiled traversal table. Properties that are
+// invariant for the lifetime of the graph (statelessness, whether any
+// successors exist) are resolved once at compile time so the orchestration
+// loop reads a flat record per hop instead of interrogating the node.
+//
+// A class rather than object literals so every record shares one hidden
+// class with fields in a fixed order — the traversal loop then stays
+// monomorphic for the JIT, which is the closest thing the loop gets to a
+// compiled fast path.
+class CompiledNode {
+    constructor(
+        public successors: Map<string, BaseNode>,
+        public reuse: boolean,
+        public hasSuccessors: boolean,
+        // True when the node uses the stock BaseNode.run, letting the
+        // orchestrator call prep/execWrapper/post directly without the extra
+        // run frame per hop
+        public inlineRun: boolean,
+        // True when no terminal node is reachable from here: structurally
+        // every path loops, so the flow can only end from this node via an
+        // unmatched action at runtime
+        public dead: boolean
+    ) {}
+}
+
+export class Flow extends BaseNode {
+    private start: BaseNode;
+    private succTable: Map<BaseNode, CompiledNode> | null = null;
+    private compiledVersion: number = -1;
+    protected maxSteps: number;
+
+    /**
+     * @param start the node traversal begins at
+     * @param maxSteps hard cap on hops per orchestration; 0 means unlimited.
+     *        A bound protects production flows from spinning forever on
+     *        mis-specified cyclic routing.
+     */
+    constructor(start: BaseNode, maxSteps: number = 0) {
+        super();
+        this.start = start;
+        this.maxSteps = maxSteps;
+    }
+
+    /**
+     * Walk the reachable subgraph from the start node once and flatten it
+     * into a lookup table, so the orchestration loop indexes the table
+     * instead of re-reading per-node state on every hop. Recompiled lazily
+     * whenever addSuccessor has mutated the graph since the last compile.
+     */
+    private compile(): void {
+        const table = new Map<BaseNode, CompiledNode>();
+        const stack: BaseNode[] = [this.start];
+        while (stack.length > 0) {
+            const node = stack.pop()!;
+            if (table.has(node)) {
+                continue;
+            }
+            table.set(node, new CompiledNode(
+                node.successors,
+                node.isStateless,
+                node.successors.size > 0,
+                node.run === BaseNode.prototype.run,
+                true // dead until proven live below
+            ));
+            for (const successor of node.successors.values()) {
+                stack.push(successor);
+            }
+        }
+
+        // A node is live when some terminal (a node with no successors) is
+        // reachable from it. Walk reversed edges outward from the terminals;
+        // whatever is never reached sits in a cycle with no exit.
+        const reversed = new Map<BaseNode, BaseNode[]>();
+        const liveFrontier: BaseNode[] = [];
+        for (const [node, entry] of table) {
+            if (!entry.hasSuccessors) {
+                entry.dead = false;
+                liveFrontier.push(node);
+            }
+            for (const successor of entry.successors.values()) {
+                let sources = reversed.get(successor);
+                if (sources === undefined) {
+                    reversed.set(successor, sources = []);
+                }
+                sources.push(node);
+            }
+        }
+        while (liveFrontier.length > 0) {
+            const node = liveFrontier.pop()!;
+            const sources = reversed.get(node);
+            if (sources === undefined) {
+                continue;
+            }
+            for (const source of sources) {
+                const entry = table.get(source)!;
+                if (entry.dead) {
+                    entry.dead = false;
+                    liveFrontier.push(source);
+                }
+            }
+        }
+
+        this.succTable = table;
+        this.compiledVersion = graphVersion;
+    }
+
+    public _clone(): BaseNode {
+        // NOTE: I don't think we need to clone the start node here
+        // We copy on ready any way during execution
+        return new Flow(this.start, this.maxSteps);
+    }
+
+    async getStartNode(): Promise<BaseNode> {
+        // This is important for parallel execution to not have race conditions
+        return this.start.clone();
+    }
+
+    async execCore(prepResult: any): Promise<any> {
+        throw new Error(FLOW_DIRECT_EXEC_ERROR);
+    }
+
+    async prep(sharedState: any): Promise<any> {
+        return {}; // Pass through the shared state to execCore
+    }
+
+    /**
+     * @param isolate force cloning even for stateless nodes. Concurrent
+     *        branches of a batch flow each carry their own params, so a node
+     *        instance shared across branches would race on flow_params at
+     *        every await point; per-branch clones are cheap (shallow) and
+     *        remove the hazard.
+     */
+    async orchestrate(sharedState: any, flowParams?: any, isolate: boolean = false): Promise<any> {
+        if (this.succTable === null || this.compiledVersion !== graphVersion) {
+            this.compile();
+        }
+
+        const params = (flowParams) ? flowParams : this.flow_params;
+        // Once inside a concurrent branch, stay isolated for every nested
+        // orchestration in this async context
+        const isolated = isolate || branchIsolationStorage.getStore() === true;
+        return branchIsolationStorage.run(isolated, () =>
+            sharedStateStorage.run(sharedState, () => this.traverse(sharedState, params, isolated))
+        );
+    }
+
+    private async traverse(sharedState: any, params: any, isolate: boolean): Promise<void> {
+        // Keep the loop on locals: every value read per hop lives in the
+        // frame rather than behind a property load on `this`
+        const table = this.succTable!;
+        const maxSteps = this.maxSteps;
+        let steps = 0;
+        let currentNode: BaseNode | undefined = this.start;
+        while (currentNode) {
+            if (maxSteps > 0 && ++steps > maxSteps) {
+                throw new Error(`Flow exceeded maxSteps (${maxSteps}); aborting orchestration`);
+            }
+            // Clone for isolation, but route through the compiled table keyed
+            // by the original node rather than asking the clone for successors.
+            // Stateless nodes skip the clone entirely and are reused in place.
+            // Nodes reached through an edge added mid-run aren't in the table;
+            // synthesize their record on the fly (not cached — they arrive via
+            // per-run clones the table should not retain).
+            let entry: CompiledNode | undefined = table.get(currentNode);
+            if (entry === undefined) {
+                entry = new CompiledNode(
+                    currentNode.successors,
+                    currentNode.isStateless,
+                    currentNode.successors.size > 0,
+                    currentNode.run === BaseNode.prototype.run,
+                    false
+                );
+            }
+            if (entry.dead) {
+                // Advisory only: termination here can still happen at runtime
+                // through an unmatched action (the documented way flows end),
+                // which static analysis can't see. maxSteps is the hard guard.
+                warnOnce(
+                    `dead:${currentNode.constructor.name}`,
+                    `Flow entered ${currentNode.constructor.name}, which cannot structurally reach a terminal node; ` +
+                    `the flow only ends if an action goes unmatched (consider setting maxSteps)`
+                );
+            }
+            const runner: BaseNode = (entry.reuse && !isolate) ? currentNode : currentNode.clone();
+            runner.setParams(params);
+            let action: string;
+            if (entry.inlineRun) {
+                const prepResult = await runner.prep(sharedState);
+                const execResult = await runner.execWrapper(prepResult);
+                action = await runner.post(prepResult, execResult, sharedState);
+            } else {
+                action = await runner.run(sharedState);
+            }
+            let nextNode: BaseNode | undefined = entry.successors.get(action); // If undefined, the flow is complete
+            if (nextNode === undefined && runner !== currentNode) {
+                // The node may have grown edges while executing (post calling
+                // addSuccessor on itself); those live on the runner clone's
+                // map, which the compiled table never saw
+                nextNode = runner.successors.get(action);
+            }
+            if (nextNode === undefined && (entry.hasSuccessors || runner.successors.size > 0)) {
+                warnOnce(
+                    `${currentNode.constructor.name}:${action}`,
+                    `Flow ends: action "${action}" from ${currentNode.constructor.name} matches none of its successors`
+                );
+            }
+            currentNode = nextNode;
+        }
+    }
+
+    async run(sharedState: any): Promise<string> {
+        const prepResult = await this.prep(sharedState);
+
+        await this.orchestrate(sharedState);
+
+        // No execution result to return for a flow
+        return this.post(prepResult, undefined, sharedState);
+    }
+
+    async post(prepResult: any, execResult: any, sharedState: any): Promise<string> {
+        return DEFAULT_ACTION;
+    }
+}
+
+export class BatchFlow extends Flow {
+    protected maxConcurrency: number;
+    protected freezeParams: boolean;
+    private mergedParamsCache: WeakMap<object, any> | null = null;
+
+    /**
+     * @param start the starting node of each parameterized sub-flow
+     * @param maxConcurrency cap on sub-flows in flight at once; 0 means
+     *        unbounded. Bounding avoids hammering downstream services when
+     *        prep returns thousands of items.
+     * @param freezeParams when true, merged params are cached per item
+     *        object, so a batch re-run over the same item set skips the
+     *        re-merge. Only enable when neither the flow's params nor the
+     *        items are mutated between runs.
+     */
+    constructor(start: BaseNode, maxConcurrency: number = 0, freezeParams: boolean = false) {
+        super(start);
+        this.maxConcurrency = maxConcurrency;
+        this.freezeParams = freezeParams;
+    }
+
+    async prep(sharedState: any): Promise<any[]> {
+        return [];
+    }
+
+    /**
+     * Layer the flow's own params under a batch item's params. Hoisted out
+     * of the batch loop so the common case — a flow with no params of its
+     * own — passes item params through without allocating a merged object
+     * per item. Sub-flows run concurrently, so when a merge is needed each
+     * item still gets its own object rather than a reused mutable one.
+     */
+    protected mergeParams(itemParams: any): any {
+        if (Object.keys(this.flow_params).length === 0) {
+            return itemParams;
+        }
+        if (this.freezeParams && itemParams !== null && typeof itemParams === "object") {
+            if (this.mergedParamsCache === null) {
+                this.mergedParamsCache = new WeakMap();
+            }
+            let merged = this.mergedParamsCache.get(itemParams);
+            if (merged === undefined) {
+                merged = { ...this.flow_params, ...itemParams };
+                this.mergedParamsCache.set(itemParams, merged);
+            }
+            return merged;
+        }
+        return { ...this.flow_params, ...itemParams };
+    }
+
+    async run(sharedState: any): Promise<string> {
+        const prepResultList = await this.prep(sharedState);
+
+        let resultList: any[];
+        if (this.maxConcurrency > 0 && prepResultList.length > this.maxConcurrency) {
+            // Fixed-size worker pool: each worker pulls the next unclaimed
+            // index, so at most maxConcurrency orchestrations run at once.
+            const results: any[] = new Array(prepResultList.length);
+            let nextIndex = 0;
+            const worker = async (): Promise<void> => {
+                while (nextIndex < prepResultList.length) {
+                    const i = nextIndex++;
+                    results[i] = await this.orchestrate(sharedState, this.mergeParams(prepResultList[i]), true);
+                }
+            };
+            await Promise.all(Array.from({ length: this.maxConcurrency }, worker));
+            resultList = results;
+        } else {
+            // Start each orchestration as the prep list is iterated and write
+            // results by index, instead of materializing a second array of
+            // promises just to hand to Promise.all
+            const results: any[] = new Array(prepResultList.length);
+            await new Promise<void>((resolve, reject) => {
+                let pending = prepResultList.length;
+                if (pending === 0) {
+                    resolve();
+                    return;
+                }
+                prepResultList.forEach((prepResult, i) => {
+                    this.orchestrate(sharedState, this.mergeParams(prepResult), true).then(
+                        (result) => {
+                            results[i] = result;
+                            if (--pending === 0) {
+                                resolve();
+                            }
+                        },
+                        reject
+                    );
+                });
+            });
+            resultList = results;
+        }
+
+        return this.post(prepResultList, resultList, sharedState);
+    }
+
+    async post(prepResultList: any[], resultList: any[], sharedState: any): Promise<string> {
+        console.log(`Processed ${resultList.length} items from ${prepResultList.length} prep results`);
+        return DEFAULT_ACTION;
+    }
+}
@@ -1,4 +1,4 @@
-import { BaseNode, Flow, RetryNode, DEFAULT_ACTION, BatchFlow } from '../src/pocket';
+import { BaseNode, Flow, RetryNode, DEFAULT_ACTION, BatchFlow, BatchNode } from '../src/pocket';
 import { HelloNode, WordNode } from '../src/testNodes';
 
 describe("Basic Flow Tests", () => {
@@ -280,6 +280,248 @@ describe("Math Flow Tests", () => {
     });
 });
 
+// Reads the orchestration's shared state through the task-local accessor
+// instead of the explicit argument.
+class ImplicitStateNode extends BaseNode {
+    async prep(sharedState: any): Promise<any> {
+        return {};
+    }
+
+    public _clone(): BaseNode {
+        return new ImplicitStateNode();
+    }
+
+    async execCore(prepResult: any): Promise<any> {
+        this.sharedState.touchedImplicitly = true;
+        return undefined;
+    }
+
+    async post(prepResult: any, execResult: any, sharedState: any): Promise<string> {
+        return DEFAULT_ACTION;
+    }
+}
+
+// Adds its successor from within post, after the graph was compiled.
+class LateWiringNode extends BaseNode {
+    async prep(sharedState: any): Promise<any> {
+        return sharedState;
+    }
+
+    public _clone(): BaseNode {
+        return new LateWiringNode();
+    }
+
+    async execCore(prepResult: any): Promise<any> {
+        return prepResult.value;
+    }
+
+    async post(prepResult: any, execResult: any, sharedState: any): Promise<string> {
+        if (!this.successors.has(DEFAULT_ACTION)) {
+            this.addSuccessor(new AddNode(5), DEFAULT_ACTION);
+        }
+        return DEFAULT_ACTION;
+    }
+}
+
+describe("Dynamic Successor Tests", () => {
+    test("Successors added during a run are still followed", async () => {
+        const flow = new Flow(new LateWiringNode());
+        const sharedState = { value: 10 };
+        await flow.run(sharedState);
+        expect(sharedState.value).toBe(15);
+    });
+});
+
+describe("Shared State Accessor Tests", () => {
+    test("Nodes can read shared state without explicit plumbing", async () => {
+        const flow = new Flow(new ImplicitStateNode());
+        const sharedState: any = {};
+        await flow.run(sharedState);
+        expect(sharedState.touchedImplicitly).toBe(true);
+    });
+});
+
+describe("Flow Safety Tests", () => {
+    test("Structurally exitless cycle still ends via an unmatched action", async () => {
+        // a -> stop -> a with no terminal anywhere, but stop's post returns
+        // "stop", which matches no successor — the documented way flows end
+        const a = new NoOpNode();
+        const stop = new WordNode("stop");
+        a.addSuccessor(stop, DEFAULT_ACTION);
+        stop.addSuccessor(a, "loop");
+
+        const flow = new Flow(a);
+        const result = await flow.run({ value: 0 });
+        expect(result).toBe(DEFAULT_ACTION);
+    });
+
+    test("maxSteps aborts a cycle whose exit is never routed to", async () => {
+        // The graph has an exit (the 'negative' branch), but the value only
+        // grows, so routing never takes it — only the step cap stops it.
+        const check = new CheckPositiveNode();
+        const add = new AddNode(1);
+        const exit = new NoOpNode();
+        check.addSuccessor(add, 'positive');
+        check.addSuccessor(exit, 'negative');
+        add.addSuccessor(check, DEFAULT_ACTION);
+
+        const flow = new Flow(check, 10);
+        await expect(flow.run({ value: 1 })).rejects.toThrow("exceeded maxSteps");
+    });
+
+    test("maxSteps survives cloning when the capped flow is nested", async () => {
+        // Same runaway cycle, but the capped flow runs as a node inside an
+        // outer flow — which clones it per hop, so the cap must be carried
+        // through _clone to still fire.
+        const check = new CheckPositiveNode();
+        const add = new AddNode(1);
+        const exit = new NoOpNode();
+        check.addSuccessor(add, 'positive');
+        check.addSuccessor(exit, 'negative');
+        add.addSuccessor(check, DEFAULT_ACTION);
+
+        const cappedInner = new Flow(check, 10);
+        const outer = new Flow(cappedInner);
+        await expect(outer.run({ value: 1 })).rejects.toThrow("exceeded maxSteps");
+    });
+});
+
+// ===================
+// Stateless Node Tests
+// ===================
+
+// A stateless node is reused across hops instead of cloned, so instance
+// fields survive between visits.
+class CountingStatelessNode extends BaseNode {
+    public visits: number = 0;
+
+    constructor() {
+        super();
+        this.isStateless = true;
+    }
+
+    public _clone(): BaseNode {
+        return new CountingStatelessNode();
+    }
+
+    async prep(sharedState: any): Promise<any> {
+        return sharedState;
+    }
+
+    async execCore(prepResult: any): Promise<any> {
+        this.visits++;
+        return prepResult.value;
+    }
+
+    async post(prepResult: any, execResult: any, sharedState: any): Promise<string> {
+        return execResult >= 0 ? 'positive' : 'negative';
+    }
+}
+
+class CloneCountingStatelessNode extends BaseNode {
+    public clones: number = 0;
+
+    constructor() {
+        super();
+        this.isStateless = true;
+    }
+
+    public _clone(): BaseNode {
+        this.clones++;
+        return new CloneCountingStatelessNode();
+    }
+
+    async prep(sharedState: any): Promise<any> {
+        return {};
+    }
+
+    async execCore(prepResult: any): Promise<any> {
+        return undefined;
+    }
+
+    async post(prepResult: any, execResult: any, sharedState: any): Promise<string> {
+        return DEFAULT_ACTION;
+    }
+}
+
+class ParamRecordingStatelessNode extends BaseNode {
+    constructor() {
+        super();
+        this.isStateless = true;
+    }
+
+    public _clone(): BaseNode {
+        return new ParamRecordingStatelessNode();
+    }
+
+    async prep(sharedState: any): Promise<any> {
+        return {};
+    }
+
+    async execCore(prepResult: any): Promise<any> {
+        return undefined;
+    }
+
+    async post(prepResult: any, execResult: any, sharedState: any): Promise<string> {
+        sharedState.seen.push(this.flow_params.id);
+        return DEFAULT_ACTION;
+    }
+}
+
+class ThreeItemBatchFlow extends BatchFlow {
+    public async prep(sharedState: any): Promise<any[]> {
+        return [{ id: 1 }, { id: 2 }, { id: 3 }];
+    }
+}
+
+describe("Stateless Node Tests", () => {
+    test("Stateless node is reused across hops instead of cloned", async () => {
+        const start = new NumberNode(6);
+        const check = new CountingStatelessNode();
+        const subtract = new SubtractNode(3);
+        const noOp = new NoOpNode();
+
+        start.addSuccessor(check, DEFAULT_ACTION);
+        check.addSuccessor(subtract, 'positive');
+        check.addSuccessor(noOp, 'negative');
+        subtract.addSuccessor(check, DEFAULT_ACTION);
+
+        const flow = new Flow(start);
+        const sharedState = { value: 0 };
+        await flow.run(sharedState);
+
+        // 6 -> 3 -> 0 -> -3: the checking node is visited four times, and
+        // because it is stateless the same instance sees every visit.
+        expect(sharedState.value).toBe(-3);
+        expect(check.visits).toBe(4);
+    });
+
+    test("Stateless reuse is suspended for concurrent batch branches", async () => {
+        const node = new CloneCountingStatelessNode();
+
+        // Sequential flow: no clones, the stateless instance is reused
+        await new Flow(node).run({});
+        expect(node.clones).toBe(0);
+
+        // Batch fan-out: branches run concurrently with different params, so
+        // each one must get its own clone despite the stateless flag
+        await new ThreeItemBatchFlow(node).run({});
+        expect(node.clones).toBe(3);
+    });
+
+    test("Branch isolation reaches stateless nodes inside nested flows", async () => {
+        // The nested Flow calls orchestrate without the isolate flag; the
+        // branch context must carry through or every branch's setParams
+        // clobbers the shared inner instance.
+        const inner = new ParamRecordingStatelessNode();
+        const batchFlow = new ThreeItemBatchFlow(new Flow(inner));
+        const sharedState: any = { seen: [] };
+        await batchFlow.run(sharedState);
+
+        expect([...sharedState.seen].sort()).toEqual([1, 2, 3]);
+    });
+});
+
 // ===================
 // Retry Node Tests
 // ===================
@@ -329,6 +571,34 @@ describe("Retry Node Tests", () => {
         const flaky = new FlakyRetryNode(2, 10, 3);
         await expect(flaky.run({})).rejects.toThrow("Max retries reached after 2 attempts");
     });
+
+    test("Single-attempt node succeeds through the direct dispatch", async () => {
+        const node = new FlakyRetryNode(1, 10, 0);
+        const result = await node.run({});
+        expect(result).toBe(DEFAULT_ACTION);
+    });
+
+    test("Single-attempt node propagates the raw error unwrapped", async () => {
+        // With maxRetries = 1 no retry was ever possible, so the failure
+        // surfaces as-is instead of the "Max retries reached" wrapper.
+        const node = new FlakyRetryNode(1, 10, 1);
+        await expect(node.run({})).rejects.toThrow("Intentional failure");
+    });
+
+    test("Custom execWrapper overrides survive the maxRetries=1 specialization", async () => {
+        class WrappedRetryNode extends FlakyRetryNode {
+            public wrapperCalls: number = 0;
+
+            public async execWrapper(prepResult: any): Promise<any> {
+                this.wrapperCalls++;
+                return super.execWrapper(prepResult);
+            }
+        }
+
+        const node = new WrappedRetryNode(1, 10, 0);
+        await node.run({});
+        expect(node.wrapperCalls).toBe(1);
+    });
 });
 
 describe("Nested Flow Tests", () => {
@@ -472,14 +742,145 @@ class ParameterizedBatchFlow extends BatchFlow {
         ];
     }
 }
+// ===================
+// Batch Node Tests
+// ===================
+
+class DelayedDoubleBatchNode extends BatchNode {
+    async prep(sharedState: any): Promise<any[]> {
+        return sharedState.items;
+    }
+
+    async execItem(item: number): Promise<number> {
+        await new Promise(resolve => setTimeout(resolve, 100));
+        return item * 2;
+    }
+
+    async post(prepResult: any, execResult: any, sharedState: any): Promise<string> {
+        sharedState.results = execResult;
+        return DEFAULT_ACTION;
+    }
+
+    public _clone(): BaseNode {
+        return new DelayedDoubleBatchNode(this.workers);
+    }
+}
+
+describe("Batch Node Tests", () => {
+    test("BatchNode processes items serially by default", async () => {
+        const node = new DelayedDoubleBatchNode();
+        const sharedState: any = { items: [1, 2, 3] };
+        await node.run(sharedState);
+        expect(sharedState.results).toEqual([2, 4, 6]);
+    });
+
+    test("BatchNode with workers overlaps item latency", async () => {
+        const node = new DelayedDoubleBatchNode(4);
+        const sharedState: any = { items: [1, 2, 3, 4] };
+
+        const start = Date.now();
+        await node.run(sharedState);
+        const elapsed = Date.now() - start;
+
+        expect(sharedState.results).toEqual([2, 4, 6, 8]);
+        // Serial execution would take ~400ms; four workers take ~100ms.
+        expect(elapsed).toBeLessThan(350);
+    });
+});
+
+class ConcurrencyTrackingNode extends BaseNode {
+    async prep(sharedState: any): Promise<any> {
+        return sharedState;
+    }
+
+    async execCore(prepResult: any): Promise<any> {
+        prepResult.inFlight++;
+        prepResult.peakInFlight = Math.max(prepResult.peakInFlight, prepResult.inFlight);
+        await new Promise(resolve => setTimeout(resolve, 50));
+        prepResult.inFlight--;
+        return undefined;
+    }
+
+    async post(prepResult: any, execResult: any, sharedState: any): Promise<string> {
+        return DEFAULT_ACTION;
+    }
+
+    public _clone(): BaseNode {
+        return new ConcurrencyTrackingNode();
+    }
+}
+
+// Records the exact params object each branch received, keyed by item id.
+class ParamsCapturingNode extends BaseNode {
+    async prep(sharedState: any): Promise<any> {
+        return {};
+    }
+
+    public _clone(): BaseNode {
+        return new ParamsCapturingNode();
+    }
+
+    async execCore(prepResult: any): Promise<any> {
+        return undefined;
+    }
+
+    async post(prepResult: any, execResult: any, sharedState: any): Promise<string> {
+        sharedState.capture[this.flow_params.id] = this.flow_params;
+        return DEFAULT_ACTION;
+    }
+}
+
+// Returns the same item objects on every run so the merge cache can hit.
+class FrozenParamsBatchFlow extends BatchFlow {
+    private items = [{ id: 1 }, { id: 2 }];
+
+    public async prep(sharedState: any): Promise<any[]> {
+        return this.items;
+    }
+}
+
+class BoundedBatchFlow extends BatchFlow {
+    public async prep(sharedState: any): Promise<any[]> {
+        return [{}, {}, {}, {}, {}, {}];
+    }
+}
+
 describe("BatchFlow Tests", () => {
     test("BatchFlow spawns parameterized flows and aggregates results", async () => {
         const templateNode = new TemplateNode();
         const batchFlow = new ParameterizedBatchFlow(templateNode);
-        
+
         const start = Date.now();
         const results = await batchFlow.run({});
         const elapsed = Date.now() - start;
         expect(elapsed).toBeLessThan(3000);
     });
+
+    test("freezeParams layers flow params under items and reuses merges across runs", async () => {
+        const flow = new FrozenParamsBatchFlow(new ParamsCapturingNode(), 0, true);
+        flow.setParams({ base: "yes" });
+
+        const firstRun: any = {};
+        await flow.run({ capture: firstRun });
+        const secondRun: any = {};
+        await flow.run({ capture: secondRun });
+
+        // Flow params sit under the item's params
+        expect(firstRun[1]).toEqual({ base: "yes", id: 1 });
+        expect(firstRun[2]).toEqual({ base: "yes", id: 2 });
+
+        // Re-running over the same item objects reuses the cached merged
+        // objects instead of re-spreading per item
+        expect(secondRun[1]).toBe(firstRun[1]);
+        expect(secondRun[2]).toBe(firstRun[2]);
+    });
+
+    test("BatchFlow caps in-flight sub-flows at maxConcurrency", async () => {
+        const batchFlow = new BoundedBatchFlow(new ConcurrencyTrackingNode(), 2);
+        const sharedState = { inFlight: 0, peakInFlight: 0 };
+        await batchFlow.run(sharedState);
+
+        expect(sharedState.peakInFlight).toBeLessThanOrEqual(2);
+        expect(sharedState.inFlight).toBe(0);
+    });
 });
\ No newline at end of file